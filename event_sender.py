@@ -4,12 +4,16 @@ OpenTelemetry Event Sender for Honeycomb
 Generates realistic web application metrics with Americas-based traffic patterns
 """
 
+import gzip
 import os
 import time
-import random
 import math
+import queue
+import sys
+import threading
+from array import array
 from datetime import datetime, timedelta, timezone
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 
 try:
     from dotenv import load_dotenv
@@ -17,21 +21,102 @@ try:
 except ImportError:
     pass  # dotenv is optional - continue without it
 
-from opentelemetry import metrics
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.resources import Resource
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None  # pyarrow is optional - only needed for Parquet files
+
+import numpy as np
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+HONEYCOMB_BATCH_URL = "https://api.honeycomb.io/1/batch/{dataset}"
+
+# Timestamps are carried as integer nanoseconds since the Unix epoch
+NS_PER_SECOND = 1_000_000_000
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+NS_PER_DAY = 24 * NS_PER_HOUR
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Honeycomb's batch endpoint accepts up to 5MB of JSON per request. Collected
+# points are flushed once their estimated payload reaches this size, which
+# leaves headroom for the points appended by the batch that crossed it.
+TARGET_BATCH_BYTES = 2 * 1024 * 1024
+# Starting estimate of one serialized event; refined from each sent batch
+ESTIMATED_EVENT_BYTES = 250
+EXPORT_WORKERS = 8
+# Flushed batches waiting for an exporter thread; generation blocks when full
+EXPORT_QUEUE_SIZE = 2 * EXPORT_WORKERS
+
+# Label keys stored as categorical columns, in the order they are exported.
+# Interned, like the label values, so every exported event shares the same key objects.
+LABEL_KEYS = tuple(sys.intern(key) for key in (
+    "service", "endpoint", "method", "status_code", "region", "user_agent_type", "query_type", "table"
+))
+
+# Metric types whose values are whole numbers; the value column stores every
+# point as a float, so these are converted back to integers at export
+INTEGER_METRIC_TYPES = ("counter", "gauge")
+
+
+def parquet_schema() -> "pa.Schema":
+    """Schema of Parquet files written with --parquet: one row per event"""
+    categorical = pa.dictionary(pa.int16(), pa.string())
+    return pa.schema(
+        [
+            ("time", pa.timestamp("ns", tz="UTC")),
+            ("metric_name", categorical),
+            ("value", pa.float64()),
+            ("metric_type", categorical),
+        ]
+        + [(key, categorical) for key in LABEL_KEYS]
+    )
+
+
+def datetime_to_ns(dt: datetime) -> int:
+    """Convert a datetime to integer nanoseconds since the Unix epoch
+
+    Naive datetimes are taken as local time, as datetime.timestamp() does.
+    """
+    if dt.tzinfo is None:
+        dt = dt.astimezone(timezone.utc)
+    return (dt - UNIX_EPOCH) // timedelta(microseconds=1) * 1_000
 
 
 class WebAppMetricsGenerator:
     """Generates realistic web application metrics"""
 
-    def __init__(self, honeycomb_api_key: str, dataset: str = "web-app-metrics"):
+    def __init__(self, honeycomb_api_key: str, dataset: str = "web-app-metrics",
+                 parquet_path: Optional[str] = None, seed: Optional[int] = None):
         self.honeycomb_api_key = honeycomb_api_key
         self.dataset = dataset
 
-        # Configure OpenTelemetry
-        self._setup_otel()
+        # When set, batches are written to this Parquet file instead of sent to Honeycomb
+        self.parquet_path = parquet_path
+        self._parquet_writer = None
+        if parquet_path:
+            if pq is None:
+                raise ImportError("Writing Parquet files requires pyarrow (pip install 'event-sender[parquet]')")
+            self._parquet_writer = pq.ParquetWriter(parquet_path, parquet_schema())
+            self._parquet_lock = threading.Lock()
+
+        # Random number generator shared by all sampling. The seed is kept so a run
+        # can be regenerated exactly; without one, a fresh seed is drawn from the OS.
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self._rng = np.random.Generator(np.random.PCG64(self.seed))
+
+        # Columnar storage for collected data points
+        self._setup_storage()
+
+        # Reuse pooled connections for every batch sent to Honeycomb
+        self._setup_session()
+
+        # Background threads that send batches while generation continues
+        self._setup_exporter()
 
         # Web app configuration
         self.services = ["web-frontend", "api-gateway", "user-service", "order-service", "payment-service"]
@@ -49,191 +134,350 @@ class WebAppMetricsGenerator:
             "Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15",
             "Mozilla/5.0 (Android 11; Mobile; rv:91.0) Gecko/91.0 Firefox/91.0"
         ]
-
-        # Metrics
-        self.request_duration_histogram = self.meter.create_histogram(
-            name="http_request_duration_seconds",
-            description="HTTP request duration in seconds",
-            unit="s"
-        )
-
-        self.request_counter = self.meter.create_counter(
-            name="http_requests_total",
-            description="Total HTTP requests"
-        )
-
-        self.active_users_gauge = self.meter.create_up_down_counter(
-            name="active_users",
-            description="Number of active users"
+        self.http_methods = ["GET", "POST", "PUT", "DELETE"]
+        self.status_codes = [200, 201, 400, 401, 403, 404, 500, 502, 503]
+        self.query_types = ["SELECT", "INSERT", "UPDATE", "DELETE"]
+        self.tables = ["users", "orders", "products", "sessions", "analytics"]
+
+        self._setup_sampling_tables()
+        self._setup_traffic_patterns()
+
+    def _setup_storage(self):
+        """Configure in-memory storage for metric data points"""
+        # Categorical string tables for metric names, types and label values.
+        # Code 0 is reserved to mean "label not set" on a data point.
+        self._vocab: Dict[str, List[Optional[str]]] = {}
+        self._vocab_codes: Dict[str, Dict[str, int]] = {}
+
+        # Store metric data points with custom timestamps as parallel columns
+        self._reset_columns()
+
+    def _setup_session(self):
+        """Configure a connection-pooled HTTP session for the Honeycomb batch API"""
+        # Retry rate-limited and server-side failures with exponential backoff
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["POST"],
+            raise_on_status=False
         )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
 
-        self.error_counter = self.meter.create_counter(
-            name="http_errors_total",
-            description="Total HTTP errors"
-        )
-
-        self.db_query_duration = self.meter.create_histogram(
-            name="db_query_duration_seconds",
-            description="Database query duration in seconds",
-            unit="s"
-        )
-
-        self.memory_usage_gauge = self.meter.create_up_down_counter(
-            name="memory_usage_bytes",
-            description="Memory usage in bytes"
-        )
-
-    def _setup_otel(self):
-        """Configure OpenTelemetry for metric collection"""
-        # Create resource with service information
-        resource = Resource.create({
-            "service.name": "event-sender",
-            "service.version": "1.0.0",
-            "deployment.environment": "production"
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "X-Honeycomb-Team": self.honeycomb_api_key,
+            "Content-Type": "application/json"
         })
 
-        # Set up the meter provider (used for metric definitions, not actual recording)
-        metrics.set_meter_provider(MeterProvider(resource=resource))
-        self.meter = metrics.get_meter("web-app-metrics")
-
-        # Store metric data points with custom timestamps
-        self.metric_data_points = []
+    def _setup_exporter(self):
+        """Start the exporter threads that consume flushed batches from a bounded queue"""
+        self._queue: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._stats_lock = threading.Lock()
+        self._batches_sent = 0
+        self._batches_exported = 0
+
+        # Number of points whose events are expected to fill TARGET_BATCH_BYTES
+        self._flush_threshold = TARGET_BATCH_BYTES // ESTIMATED_EVENT_BYTES
+
+        # A single writer appends Parquet record batches in the order they were flushed,
+        # keeping the file in time order and identical for the same seed
+        workers = 1 if self._parquet_writer is not None else EXPORT_WORKERS
+        self._exporter_threads = [
+            threading.Thread(target=self._export_worker, name=f"exporter-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._exporter_threads:
+            thread.start()
+
+    def _reset_columns(self):
+        """Start a new, empty set of data point columns"""
+        self._names = array('B')
+        self._values = array('d')
+        self._timestamps_ns = array('q')
+        self._types = array('B')
+        self._labels = {key: array('B') for key in LABEL_KEYS}
+
+    def _code(self, field: str, value: str) -> int:
+        """Return the categorical code for a string value, adding it to the table if new"""
+        codes = self._vocab_codes.setdefault(field, {})
+        code = codes.get(value)
+        if code is None:
+            # Interned so that each distinct value exists once however many events carry it
+            value = sys.intern(value)
+            table = self._vocab.setdefault(field, [None])
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def _codes(self, field: str, values: Sequence[str]) -> np.ndarray:
+        """Return a lookup array mapping positions in values to their categorical codes"""
+        return np.array([self._code(field, value) for value in values], dtype=np.uint8)
 
     def _record_metric_with_timestamp(self, metric_name: str, value: float, labels: Dict[str, str],
-                                    timestamp: datetime, metric_type: str = "histogram"):
-        """Record a metric data point with a specific timestamp"""
-        timestamp_ns = int(timestamp.timestamp() * 1_000_000_000)  # Convert to nanoseconds
-
-        data_point = {
-            "name": metric_name,
-            "value": value,
-            "labels": labels,
-            "timestamp_ns": timestamp_ns,
-            "type": metric_type
+                                    timestamp_ns: int, metric_type: str = "histogram"):
+        """Record a metric data point with a specific timestamp (nanoseconds since the epoch)"""
+        self._names.append(self._code("metric_name", metric_name))
+        self._values.append(value)
+        self._timestamps_ns.append(timestamp_ns)
+        self._types.append(self._code("metric_type", metric_type))
+        for key, column in self._labels.items():
+            label = labels.get(key)
+            column.append(0 if label is None else self._code(key, label))
+
+        if len(self._values) >= self._flush_threshold:
+            self._enqueue_flush()
+
+    def _record_metrics_with_timestamp(self, metric_name: str, values: np.ndarray,
+                                       label_codes: Dict[str, np.ndarray], timestamp_ns: int,
+                                       metric_type: str = "histogram"):
+        """Record a batch of data points sharing a name, type and timestamp
+
+        label_codes maps label keys to arrays of categorical codes, one per value.
+        """
+        n = len(values)
+
+        self._names.frombytes(bytes([self._code("metric_name", metric_name)]) * n)
+        self._values.frombytes(np.asarray(values, dtype=np.float64).tobytes())
+        self._timestamps_ns.extend(array('q', [timestamp_ns]) * n)
+        self._types.frombytes(bytes([self._code("metric_type", metric_type)]) * n)
+        for key, column in self._labels.items():
+            codes = label_codes.get(key)
+            column.frombytes(bytes(n) if codes is None else np.asarray(codes, dtype=np.uint8).tobytes())
+
+        if len(self._values) >= self._flush_threshold:
+            self._enqueue_flush()
+
+    def _setup_sampling_tables(self):
+        """Precompute the categorical lookup arrays used by the batch samplers"""
+        # Label codes indexed by position in the configuration lists set in __init__
+        self._service_codes = self._codes("service", self.services)
+        self._method_codes = self._codes("method", self.http_methods)
+        self._status_code_codes = self._codes("status_code", [str(code) for code in self.status_codes])
+        self._region_codes = self._codes("region", self.regions)
+        self._query_type_codes = self._codes("query_type", self.query_types)
+        self._table_codes = self._codes("table", self.tables)
+
+        # Each user agent is classified once; requests look the category up by index
+        self._user_agent_type_codes = self._codes(
+            "user_agent_type", [self._classify_user_agent(user_agent) for user_agent in self.user_agents]
+        )
+
+        # Endpoints of all services flattened into one table (CSR layout): the
+        # endpoints of service i are entries offsets[i] to offsets[i] + lengths[i] - 1
+        flat_endpoints = [endpoint for service in self.services for endpoint in self.endpoints[service]]
+        self._endpoint_lengths = np.array([len(self.endpoints[service]) for service in self.services])
+        self._endpoint_offsets = np.cumsum(self._endpoint_lengths) - self._endpoint_lengths
+        self._endpoint_codes = self._codes("endpoint", flat_endpoints)
+        self._fast_endpoints = np.array([endpoint in ["/", "/health"] for endpoint in flat_endpoints])
+
+        self._status_code_values = np.array(self.status_codes)
+
+        # Baseline memory usage of each service, in bytes
+        base_memory_mb = {
+            "web-frontend": 512,
+            "api-gateway": 256,
+            "user-service": 384,
+            "order-service": 512,
+            "payment-service": 256
         }
+        self._base_memory = np.array([base_memory_mb[service] for service in self.services], dtype=np.int64) * 1024 * 1024
+
+        # Cumulative distributions for inverse-CDF sampling of weighted categories
+        self._method_cdf = self._cdf([70, 20, 8, 2])
+        self._region_cdf = self._cdf([40, 30, 20, 10])
+        self._status_cdf = self._cdf([80, 5, 3, 2, 1, 4, 2, 1, 2])
+        self._query_type_cdf = self._cdf([70, 15, 10, 5])
+
+        # Lognormal (mean, sigma) of request durations: normal, fast for simple
+        # endpoints, slower for errors
+        self._request_duration_mean = np.array([0.0, -1.0, 1.5])
+        self._request_duration_sigma = np.array([0.7, 0.5, 0.8])
+
+        # Lognormal (mean, sigma) of query durations by type: fast selects, fast
+        # inserts, slower updates/deletes
+        self._query_duration_mean = np.array([-2.0, -1.5, -1.0, -1.0])
+        self._query_duration_sigma = np.array([0.6, 0.4, 0.8, 0.8])
+
+    @staticmethod
+    def _cdf(weights: Sequence[float]) -> np.ndarray:
+        """Return the normalized cumulative distribution of a list of weights"""
+        cdf = np.cumsum(weights, dtype=np.float64)
+        return cdf / cdf[-1]
+
+    def _sample_weighted(self, cdf: np.ndarray, n: int) -> np.ndarray:
+        """Draw n category indices from a precomputed cumulative distribution"""
+        return np.searchsorted(cdf, self._rng.random(n), side="right")
+
+    def _setup_traffic_patterns(self):
+        """Precompute the traffic multiplier for every (weekday, EST hour) pair"""
+        self._traffic_lut = np.zeros((7, 24), dtype=np.float64)
+        # Scale of the random jitter added on top of the table (overnight hours only)
+        self._traffic_jitter = np.zeros((7, 24), dtype=np.float64)
+
+        for weekday in range(7):
+            # Weekly pattern - lower traffic on weekends
+            weekday_multiplier = 0.6 if weekday >= 5 else 1.0
+
+            for est_hour in range(24):
+                # Daily pattern - higher traffic during business hours
+                if 6 <= est_hour <= 23:  # 6 AM to 11 PM EST
+                    # Peak hours: 9-12 AM, 2-5 PM, 7-9 PM
+                    if 9 <= est_hour <= 12 or 14 <= est_hour <= 17 or 19 <= est_hour <= 21:
+                        hour_multiplier = 1.5 + 0.3 * math.sin((est_hour - 9) * math.pi / 12)
+                    else:
+                        hour_multiplier = 1.0 + 0.2 * math.sin((est_hour - 6) * math.pi / 17)
+                else:
+                    # Overnight hours, plus up to 0.1 of random jitter
+                    hour_multiplier = 0.2
+                    self._traffic_jitter[weekday, est_hour] = weekday_multiplier * 0.1
 
-        self.metric_data_points.append(data_point)
+                self._traffic_lut[weekday, est_hour] = weekday_multiplier * hour_multiplier
 
-    def get_traffic_multiplier(self, dt: datetime) -> float:
+    def get_traffic_multiplier(self, timestamp_ns: int) -> float:
         """Calculate traffic multiplier based on time patterns"""
+        # The epoch fell on a Thursday (weekday 3)
+        weekday = (timestamp_ns // NS_PER_DAY + 3) % 7
         # Americas timezone (EST/EDT)
-        est_hour = (dt.hour - 5) % 24  # Rough EST conversion
-
-        # Weekly pattern - lower traffic on weekends
-        weekday_multiplier = 0.6 if dt.weekday() >= 5 else 1.0
-
-        # Daily pattern - higher traffic during business hours
-        if 6 <= est_hour <= 23:  # 6 AM to 11 PM EST
-            # Peak hours: 9-12 AM, 2-5 PM, 7-9 PM
-            if 9 <= est_hour <= 12 or 14 <= est_hour <= 17 or 19 <= est_hour <= 21:
-                hour_multiplier = 1.5 + 0.3 * math.sin((est_hour - 9) * math.pi / 12)
-            else:
-                hour_multiplier = 1.0 + 0.2 * math.sin((est_hour - 6) * math.pi / 17)
-        else:
-            # Overnight hours
-            hour_multiplier = 0.2 + 0.1 * random.random()
-
-        return weekday_multiplier * hour_multiplier
-
-    def generate_request_metrics(self, timestamp: datetime):
+        est_hour = (timestamp_ns // NS_PER_HOUR - 5) % 24  # Rough EST conversion
+
+        jitter = self._traffic_jitter[weekday, est_hour]
+        return float(self._traffic_lut[weekday, est_hour] + (jitter * self._rng.random() if jitter else 0.0))
+
+    def traffic_multipliers(self, timestamps_ns: np.ndarray) -> np.ndarray:
+        """Calculate traffic multipliers for an array of timestamps in one pass"""
+        weekday = (timestamps_ns // NS_PER_DAY + 3) % 7
+        est_hour = (timestamps_ns // NS_PER_HOUR - 5) % 24
+        jitter = self._traffic_jitter[weekday, est_hour] * self._rng.random(len(timestamps_ns))
+        return self._traffic_lut[weekday, est_hour] + jitter
+
+    def generate_interval_metrics(self, timestamp_ns: int, traffic_mult: Optional[float] = None):
+        """Generate all metric types for one time interval"""
+        # One traffic multiplier is shared by every generator in the interval
+        if traffic_mult is None:
+            traffic_mult = self.get_traffic_multiplier(timestamp_ns)
+
+        self.generate_request_metrics(timestamp_ns, traffic_mult)
+        self.generate_database_metrics(timestamp_ns, traffic_mult)
+        self.generate_system_metrics(timestamp_ns, traffic_mult)
+        self.generate_user_metrics(timestamp_ns, traffic_mult)
+
+    def generate_request_metrics(self, timestamp_ns: int, traffic_mult: Optional[float] = None):
         """Generate HTTP request metrics"""
-        traffic_mult = self.get_traffic_multiplier(timestamp)
+        if traffic_mult is None:
+            traffic_mult = self.get_traffic_multiplier(timestamp_ns)
         base_requests_per_minute = 1000
-        requests_this_minute = int(base_requests_per_minute * traffic_mult * (0.8 + 0.4 * random.random()))
-
-        for _ in range(requests_this_minute):
-            service = random.choice(self.services)
-            endpoint = random.choice(self.endpoints[service])
-            method = random.choices(["GET", "POST", "PUT", "DELETE"], weights=[70, 20, 8, 2])[0]
-            region = random.choices(self.regions, weights=[40, 30, 20, 10])[0]
-            user_agent = random.choice(self.user_agents)
-
-            # Status code distribution
-            status_code = random.choices(
-                [200, 201, 400, 401, 403, 404, 500, 502, 503],
-                weights=[80, 5, 3, 2, 1, 4, 2, 1, 2]
-            )[0]
-
-            # Response time based on endpoint and status
-            if status_code >= 500:
-                duration = random.lognormvariate(1.5, 0.8)  # Slower for errors
-            elif endpoint in ["/", "/health"]:
-                duration = random.lognormvariate(-1, 0.5)  # Fast for simple endpoints
-            else:
-                duration = random.lognormvariate(0, 0.7)   # Normal distribution
-
-            duration = max(0.001, min(30.0, duration))  # Clamp between 1ms and 30s
-
-            labels = {
-                "service": service,
-                "endpoint": endpoint,
-                "method": method,
-                "status_code": str(status_code),
-                "region": region,
-                "user_agent_type": self._classify_user_agent(user_agent)
-            }
+        requests_this_minute = int(base_requests_per_minute * traffic_mult * (0.8 + 0.4 * self._rng.random()))
 
-            # Record metrics with historical timestamp
-            self._record_metric_with_timestamp("http_request_duration_seconds", duration, labels, timestamp, "histogram")
-            self._record_metric_with_timestamp("http_requests_total", 1, labels, timestamp, "counter")
+        if requests_this_minute <= 0:
+            return
 
-            if status_code >= 400:
-                self._record_metric_with_timestamp("http_errors_total", 1, labels, timestamp, "counter")
+        durations, status, label_codes = self._sample_requests(requests_this_minute)
+
+        # Record metrics with historical timestamp
+        self._record_metrics_with_timestamp("http_request_duration_seconds", durations, label_codes, timestamp_ns, "histogram")
+        self._record_metrics_with_timestamp("http_requests_total", np.ones(len(durations)), label_codes, timestamp_ns, "counter")
+
+        client_or_server_error = status >= 400
+        error_codes = {key: codes[client_or_server_error] for key, codes in label_codes.items()}
+        self._record_metrics_with_timestamp("http_errors_total", np.ones(int(client_or_server_error.sum())),
+                                            error_codes, timestamp_ns, "counter")
+
+    def _sample_requests(self, n: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """Draw n requests as raw columns: durations, status codes and label codes"""
+        rng = self._rng
+
+        # Draw every request attribute for this interval in one batch
+        service_idx = rng.integers(0, len(self.services), size=n)
+        method_idx = self._sample_weighted(self._method_cdf, n)
+        region_idx = self._sample_weighted(self._region_cdf, n)
+        user_agent_idx = rng.integers(0, len(self.user_agents), size=n)
+
+        # Status code distribution
+        status_idx = self._sample_weighted(self._status_cdf, n)
+        status = self._status_code_values[status_idx]
+
+        # Pick a uniform endpoint within each request's own service
+        endpoint_idx = self._endpoint_offsets[service_idx] + (
+            rng.random(n) * self._endpoint_lengths[service_idx]
+        ).astype(np.int64)
+        fast_endpoint = self._fast_endpoints[endpoint_idx]
+
+        # Response time based on endpoint and status; each request samples
+        # with the (mean, sigma) of its latency profile
+        latency_profile = np.where(status >= 500, 2, np.where(fast_endpoint, 1, 0))
+        durations = rng.lognormal(
+            mean=self._request_duration_mean[latency_profile],
+            sigma=self._request_duration_sigma[latency_profile]
+        )
 
-    def generate_database_metrics(self, timestamp: datetime):
+        durations = np.clip(durations, 0.001, 30.0)  # Clamp between 1ms and 30s
+
+        label_codes = {
+            "service": self._service_codes[service_idx],
+            "endpoint": self._endpoint_codes[endpoint_idx],
+            "method": self._method_codes[method_idx],
+            "status_code": self._status_code_codes[status_idx],
+            "region": self._region_codes[region_idx],
+            "user_agent_type": self._user_agent_type_codes[user_agent_idx]
+        }
+        return durations, status, label_codes
+
+    def generate_database_metrics(self, timestamp_ns: int, traffic_mult: Optional[float] = None):
         """Generate database query metrics"""
-        traffic_mult = self.get_traffic_multiplier(timestamp)
+        if traffic_mult is None:
+            traffic_mult = self.get_traffic_multiplier(timestamp_ns)
         base_queries_per_minute = 500
-        queries_this_minute = int(base_queries_per_minute * traffic_mult * (0.9 + 0.2 * random.random()))
+        queries_this_minute = int(base_queries_per_minute * traffic_mult * (0.9 + 0.2 * self._rng.random()))
+
+        if queries_this_minute <= 0:
+            return
 
-        query_types = ["SELECT", "INSERT", "UPDATE", "DELETE"]
-        tables = ["users", "orders", "products", "sessions", "analytics"]
+        durations, label_codes = self._sample_queries(queries_this_minute)
+        self._record_metrics_with_timestamp("db_query_duration_seconds", durations, label_codes, timestamp_ns, "histogram")
 
-        for _ in range(queries_this_minute):
-            query_type = random.choices(query_types, weights=[70, 15, 10, 5])[0]
-            table = random.choice(tables)
+    def _sample_queries(self, n: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Draw n database queries as raw columns: durations and label codes"""
+        rng = self._rng
 
-            # Query duration based on type and complexity
-            if query_type == "SELECT":
-                duration = random.lognormvariate(-2, 0.6)  # Fast selects
-            elif query_type == "INSERT":
-                duration = random.lognormvariate(-1.5, 0.4)  # Fast inserts
-            else:
-                duration = random.lognormvariate(-1, 0.8)   # Slower updates/deletes
+        query_idx = self._sample_weighted(self._query_type_cdf, n)
+        table_idx = rng.integers(0, len(self.tables), size=n)
+        service_idx = rng.integers(1, len(self.services), size=n)  # Skip frontend
 
-            duration = max(0.001, min(10.0, duration))
+        # Query duration based on type and complexity
+        durations = rng.lognormal(
+            mean=self._query_duration_mean[query_idx],
+            sigma=self._query_duration_sigma[query_idx]
+        )
 
-            labels = {
-                "query_type": query_type,
-                "table": table,
-                "service": random.choice(self.services[1:])  # Skip frontend
-            }
+        durations = np.clip(durations, 0.001, 10.0)
 
-            self._record_metric_with_timestamp("db_query_duration_seconds", duration, labels, timestamp, "histogram")
+        label_codes = {
+            "query_type": self._query_type_codes[query_idx],
+            "table": self._table_codes[table_idx],
+            "service": self._service_codes[service_idx]
+        }
+        return durations, label_codes
 
-    def generate_system_metrics(self, timestamp: datetime):
+    def generate_system_metrics(self, timestamp_ns: int, traffic_mult: Optional[float] = None):
         """Generate system resource metrics"""
-        for service in self.services:
-            # Memory usage with some realistic variation
-            base_memory = {
-                "web-frontend": 512 * 1024 * 1024,  # 512MB
-                "api-gateway": 256 * 1024 * 1024,   # 256MB
-                "user-service": 384 * 1024 * 1024,  # 384MB
-                "order-service": 512 * 1024 * 1024, # 512MB
-                "payment-service": 256 * 1024 * 1024 # 256MB
-            }
+        if traffic_mult is None:
+            traffic_mult = self.get_traffic_multiplier(timestamp_ns)
 
-            traffic_mult = self.get_traffic_multiplier(timestamp)
-            memory_usage = int(base_memory[service] * (0.8 + 0.4 * traffic_mult + 0.1 * random.random()))
+        # Memory usage with some realistic variation, for every service at once
+        noise = self._rng.random(len(self.services))
+        memory_usage = (self._base_memory * (0.8 + 0.4 * traffic_mult + 0.1 * noise)).astype(np.int64)
 
-            labels = {"service": service}
-            self._record_metric_with_timestamp("memory_usage_bytes", memory_usage, labels, timestamp, "gauge")
+        label_codes = {"service": self._service_codes}
+        self._record_metrics_with_timestamp("memory_usage_bytes", memory_usage, label_codes, timestamp_ns, "gauge")
 
-    def generate_user_metrics(self, timestamp: datetime):
+    def generate_user_metrics(self, timestamp_ns: int, traffic_mult: Optional[float] = None):
         """Generate active user metrics"""
-        traffic_mult = self.get_traffic_multiplier(timestamp)
+        if traffic_mult is None:
+            traffic_mult = self.get_traffic_multiplier(timestamp_ns)
         base_active_users = 5000
-        active_users = int(base_active_users * traffic_mult * (0.9 + 0.2 * random.random()))
+        active_users = int(base_active_users * traffic_mult * (0.9 + 0.2 * self._rng.random()))
 
         # Distribute across regions
         for region in self.regions:
@@ -241,68 +485,207 @@ class WebAppMetricsGenerator:
             region_users = int(active_users * region_weight[region])
 
             labels = {"region": region}
-            self._record_metric_with_timestamp("active_users", region_users, labels, timestamp, "gauge")
+            self._record_metric_with_timestamp("active_users", region_users, labels, timestamp_ns, "gauge")
 
-    def _export_collected_metrics(self):
-        """Export all collected metrics with their historical timestamps to Honeycomb"""
-        if not self.metric_data_points:
+    def _enqueue_flush(self):
+        """Hand the collected columns to the exporter threads and start new ones"""
+        if not self._values:
             return
 
-        print(f"Exporting {len(self.metric_data_points)} metric data points...")
+        batch = (self._names, self._values, self._timestamps_ns, self._types, self._labels)
+        self._reset_columns()
+        self._queue.put(batch)  # Blocks while the exporters are behind
 
-        # Convert metric data points to Honeycomb events format
-        events = []
-        for data_point in self.metric_data_points:
-            # Convert nanoseconds timestamp to ISO string
-            timestamp_dt = datetime.fromtimestamp(data_point["timestamp_ns"] / 1_000_000_000, tz=timezone.utc)
+    def _export_worker(self):
+        """Send flushed batches to Honeycomb until a stop sentinel is received"""
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+
+                with self._stats_lock:
+                    self._batches_sent += 1
+                    batch_number = self._batches_sent
+                try:
+                    exported = self._export_batch(batch, batch_number)
+                except Exception as e:
+                    # A dead worker would leave generation blocked on the full queue,
+                    # so any unexpected error only fails this batch
+                    print(f"✗ Failed to export batch {batch_number}: {e}")
+                    exported = False
+
+                if exported:
+                    with self._stats_lock:
+                        self._batches_exported += 1
+            finally:
+                self._queue.task_done()
+
+    def _export_batch(self, batch: tuple, batch_number: int) -> bool:
+        """Convert one flushed batch of columns to Honeycomb events and send it, returning success"""
+        if self._parquet_writer is not None:
+            return self._write_parquet_batch(batch, batch_number)
+
+        names, values, timestamps_ns, types, labels = batch
+        events = self._build_events(names, values, timestamps_ns, types, labels)
+        body = orjson.dumps(events)
+
+        # Size later flushes from the measured bytes per event
+        self._flush_threshold = max(1, TARGET_BATCH_BYTES * len(events) // len(body))
+
+        try:
+            response = self._post_batch(body)
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Failed to export batch {batch_number}: {e}")
+            return False
+
+        if response.status_code != 200:
+            print(f"✗ Failed to export batch {batch_number}: HTTP {response.status_code} - {response.text}")
+            return False
+
+        print(f"✓ Exported batch {batch_number}: {len(events)} events")
+        return True
+
+    def _write_parquet_batch(self, batch: tuple, batch_number: int) -> bool:
+        """Append one flushed batch of columns to the Parquet file as a record batch, returning success"""
+        names, values, timestamps_ns, types, labels = batch
+        record_batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(np.frombuffer(timestamps_ns, dtype=np.int64), type=pa.timestamp("ns", tz="UTC")),
+                self._dictionary_array("metric_name", names),
+                pa.array(np.frombuffer(values, dtype=np.float64)),
+                self._dictionary_array("metric_type", types),
+            ]
+            + [self._dictionary_array(key, labels[key]) for key in LABEL_KEYS],
+            schema=parquet_schema()
+        )
 
-            # Create event in Honeycomb format
-            event = {
-                "time": timestamp_dt.isoformat(),
-                "data": {
-                    "metric_name": data_point["name"],
-                    "value": data_point["value"],
-                    "metric_type": data_point["type"],
-                    **data_point["labels"]  # Spread labels as individual fields
-                }
+        try:
+            # ParquetWriter is not thread-safe; record batches are appended one at a time
+            with self._parquet_lock:
+                self._parquet_writer.write_batch(record_batch)
+        except (OSError, pa.ArrowException) as e:
+            print(f"✗ Failed to write batch {batch_number}: {e}")
+            return False
+
+        print(f"✓ Wrote batch {batch_number}: {len(values)} events to {self.parquet_path}")
+        return True
+
+    def _dictionary_array(self, field: str, codes: array) -> "pa.DictionaryArray":
+        """Convert a column of categorical codes to an Arrow dictionary array (code 0 becomes null)"""
+        indices = np.frombuffer(codes, dtype=np.uint8).astype(np.int16) - 1
+        dictionary = self._vocab.get(field, [None])[1:]
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, mask=indices < 0),
+            pa.array(dictionary, type=pa.string())
+        )
+
+    def _columns_from_record_batch(self, record_batch: "pa.RecordBatch") -> tuple:
+        """Convert a record batch read from a Parquet file back into categorical columns"""
+        def codes(field: str) -> array:
+            column = array('B')
+            if field not in record_batch.schema.names:
+                column.frombytes(bytes(record_batch.num_rows))
+                return column
+
+            values = record_batch.column(field)
+            if not pa.types.is_dictionary(values.type):
+                values = values.dictionary_encode()
+            # Index 0 of the lookup maps null entries to "label not set"
+            lookup = np.concatenate(([0], self._codes(field, values.dictionary.to_pylist()))).astype(np.uint8)
+            indices = pc.fill_null(values.indices, -1).to_numpy().astype(np.int64) + 1
+            column.frombytes(lookup[indices].tobytes())
+            return column
+
+        values = array('d')
+        values.frombytes(record_batch.column("value").to_numpy().astype(np.float64).tobytes())
+        timestamps_ns = array('q')
+        timestamps_ns.frombytes(record_batch.column("time").cast(pa.int64()).to_numpy().tobytes())
+
+        labels = {key: codes(key) for key in LABEL_KEYS}
+        return codes("metric_name"), values, timestamps_ns, codes("metric_type"), labels
+
+    def send_parquet_file(self, path: str):
+        """Send the events stored in a Parquet file written with --parquet to Honeycomb"""
+        if pq is None:
+            raise ImportError("Reading Parquet files requires pyarrow (pip install 'event-sender[parquet]')")
+
+        parquet_file = pq.ParquetFile(path)
+        print(f"Sending {parquet_file.metadata.num_rows} events from {path}")
+
+        for record_batch in parquet_file.iter_batches(batch_size=self._flush_threshold):
+            self._queue.put(self._columns_from_record_batch(record_batch))
+
+        self._export_collected_metrics()
+
+    def _build_events(self, names: array, values: array, timestamps_ns: array, types: array,
+                      labels: Dict[str, array]) -> List[dict]:
+        """Convert columns of data points to Honeycomb events format"""
+        name_table = self._vocab["metric_name"]
+        type_table = self._vocab["metric_type"]
+        label_columns = [(key, self._vocab.get(key), column) for key, column in labels.items()]
+        integer_types = {code for code, name in enumerate(type_table) if name in INTEGER_METRIC_TYPES}
+
+        # Format every nanosecond timestamp in the batch as an RFC 3339 string in one call
+        times = np.datetime_as_string(
+            np.frombuffer(timestamps_ns, dtype=np.int64).view("datetime64[ns]"),
+            unit="ns",
+            timezone="UTC"
+        ).tolist()
+
+        events = []
+        for i, time_str in enumerate(times):
+            type_code = types[i]
+            data = {
+                "metric_name": name_table[names[i]],
+                "value": int(values[i]) if type_code in integer_types else values[i],
+                "metric_type": type_table[type_code]
             }
-            events.append(event)
+            # Spread labels as individual fields
+            for key, table, column in label_columns:
+                code = column[i]
+                if code:
+                    data[key] = table[code]
 
-        # Send events in batches to Honeycomb
-        batch_size = 100  # Honeycomb recommends smaller batches for events
-        total_events = len(events)
-        successful_batches = 0
+            # Create event in Honeycomb format
+            events.append({"time": time_str, "data": data})
+
+        return events
+
+    def _post_batch(self, body: bytes) -> requests.Response:
+        """Send one JSON-encoded batch of events to the Honeycomb Events API"""
+        # Repetitive event JSON compresses very well; level 1 keeps compression cheap.
+        # The session already sends Content-Type: application/json
+        return self._session.post(
+            HONEYCOMB_BATCH_URL.format(dataset=self.dataset),
+            data=gzip.compress(body, compresslevel=1),
+            headers={"Content-Encoding": "gzip"},
+            timeout=30
+        )
 
-        for i in range(0, total_events, batch_size):
-            batch = events[i:i+batch_size]
+    def _export_collected_metrics(self):
+        """Flush any remaining metrics and wait until every queued batch has been sent"""
+        self._enqueue_flush()
+        self._queue.join()
 
-            try:
-                # Send to Honeycomb Events API
-                response = requests.post(
-                    f"https://api.honeycomb.io/1/batch/{self.dataset}",
-                    headers={
-                        "X-Honeycomb-Team": self.honeycomb_api_key,
-                        "Content-Type": "application/json"
-                    },
-                    json=batch,
-                    timeout=30
-                )
-
-                if response.status_code == 200:
-                    successful_batches += 1
-                    print(f"✓ Exported batch {i//batch_size + 1}/{(total_events-1)//batch_size + 1}: {len(batch)} events")
-                else:
-                    print(f"✗ Failed to export batch {i//batch_size + 1}: HTTP {response.status_code} - {response.text}")
+        with self._stats_lock:
+            sent, exported = self._batches_sent, self._batches_exported
+            self._batches_sent = self._batches_exported = 0
 
-            except requests.exceptions.RequestException as e:
-                print(f"✗ Failed to export batch {i//batch_size + 1}: {e}")
+        if sent:
+            print(f"Export completed: {exported}/{sent} batches successful")
 
-            # Small delay between batches
-            time.sleep(0.1)
+    def close(self):
+        """Export any remaining metrics and stop the exporter threads"""
+        self._export_collected_metrics()
+        for _ in self._exporter_threads:
+            self._queue.put(None)
+        for thread in self._exporter_threads:
+            thread.join()
 
-        # Clear the collected data points
-        self.metric_data_points.clear()
-        print(f"Export completed: {successful_batches}/{(total_events-1)//batch_size + 1} batches successful")
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
 
     def _classify_user_agent(self, user_agent: str) -> str:
         """Classify user agent into categories"""
@@ -316,42 +699,44 @@ class WebAppMetricsGenerator:
     def generate_metrics_for_timerange(self, start_date: datetime, end_date: datetime,
                                      interval_minutes: int = 1):
         """Generate metrics for a specific time range"""
-        current_time = start_date
-        total_intervals = int((end_date - start_date).total_seconds() / (interval_minutes * 60))
+        # Every interval timestamp, and its traffic multiplier, is computed up front
+        interval_ns = interval_minutes * 60 * NS_PER_SECOND
+        timestamps_ns = np.arange(datetime_to_ns(start_date), datetime_to_ns(end_date), interval_ns, dtype=np.int64)
+        traffic_mults = self.traffic_multipliers(timestamps_ns)
+        total_intervals = len(timestamps_ns)
 
         print(f"Generating metrics from {start_date} to {end_date}")
+        print(f"Random seed: {self.seed}")
         print(f"Total intervals: {total_intervals} ({interval_minutes} minute intervals)")
 
         interval_count = 0
-        while current_time < end_date:
+        for timestamp_ns, traffic_mult in zip(timestamps_ns.tolist(), traffic_mults.tolist()):
             # Generate all metric types for this time interval
-            self.generate_request_metrics(current_time)
-            self.generate_database_metrics(current_time)
-            self.generate_system_metrics(current_time)
-            self.generate_user_metrics(current_time)
+            self.generate_interval_metrics(timestamp_ns, traffic_mult)
 
-            # Progress reporting and periodic export
+            # Progress reporting (batches are exported in the background as they fill)
             interval_count += 1
             if interval_count % 100 == 0:
                 progress = (interval_count / total_intervals) * 100
                 print(f"Progress: {progress:.1f}% ({interval_count}/{total_intervals})")
-                # Export metrics periodically to avoid memory buildup
-                self._export_collected_metrics()
-
-            current_time += timedelta(minutes=interval_minutes)
 
-            # Small delay to prevent overwhelming the system
-            time.sleep(0.01)
-
-    def run_historical_generation(self, days: int = 35):
-        """Generate historical metrics for the specified number of days"""
-        end_time = datetime.now(timezone.utc)
+    def run_historical_generation(self, days: int = 35, end_time: Optional[datetime] = None,
+                                  interval_minutes: int = 1):
+        """Generate historical metrics for the specified number of days, ending now or at end_time"""
+        if end_time is None:
+            end_time = datetime.now(timezone.utc)
+        # Align the range to whole intervals, so the same seed, days and end time
+        # (even one a few seconds later) regenerate identical data
+        interval_ns = interval_minutes * 60 * NS_PER_SECOND
+        end_ns = datetime_to_ns(end_time) // interval_ns * interval_ns
+        end_time = UNIX_EPOCH + timedelta(microseconds=end_ns // 1_000)
         start_time = end_time - timedelta(days=days)
 
         print(f"Starting historical metrics generation for {days} days")
         print(f"Time range: {start_time} to {end_time}")
+        print(f"To regenerate this data, pass: --seed {self.seed} --days {days} --end {end_time.isoformat()}")
 
-        self.generate_metrics_for_timerange(start_time, end_time)
+        self.generate_metrics_for_timerange(start_time, end_time, interval_minutes)
 
         # Export any remaining metrics
         self._export_collected_metrics()
@@ -367,12 +752,10 @@ class WebAppMetricsGenerator:
         while time.time() < end_time:
             current_dt = datetime.now(timezone.utc)
 
-            self.generate_request_metrics(current_dt)
-            self.generate_database_metrics(current_dt)
-            self.generate_system_metrics(current_dt)
-            self.generate_user_metrics(current_dt)
+            self.generate_interval_metrics(datetime_to_ns(current_dt))
 
             print(f"Generated metrics batch at {current_dt.strftime('%H:%M:%S')}")
+            self._enqueue_flush()
             time.sleep(60)  # Generate every minute
 
         print("Real-time metrics generation completed!")
@@ -387,21 +770,38 @@ def main():
     parser.add_argument("--dataset", default="web-app-metrics", help="Honeycomb dataset name")
     parser.add_argument("--days", type=int, default=35, help="Days of historical data to generate")
     parser.add_argument("--realtime", type=int, help="Generate real-time data for N hours instead")
+    parser.add_argument("--end", type=datetime.fromisoformat, metavar="DATETIME",
+                        help="End of the historical range as an ISO 8601 time, local time unless an offset is given (default: now)")
+    parser.add_argument("--seed", type=int, help="Random seed; the same seed, --days and --end regenerate identical data")
+    parquet_mode = parser.add_mutually_exclusive_group()
+    parquet_mode.add_argument("--parquet", metavar="PATH",
+                              help="Write generated events to a Parquet file instead of sending them to Honeycomb")
+    parquet_mode.add_argument("--send-parquet", metavar="PATH",
+                              help="Send the events in a Parquet file written with --parquet instead of generating new ones")
 
     args = parser.parse_args()
 
-    # Get API key from command line or environment variable
+    if (args.parquet or args.send_parquet) and pq is None:
+        print("Error: Parquet support requires pyarrow. Install it with: pip install 'event-sender[parquet]'")
+        return
+
+    # Get API key from command line or environment variable (not needed to write a file)
     api_key = args.api_key or os.getenv("HONEYCOMB_API_KEY")
-    if not api_key:
+    if not api_key and not args.parquet:
         print("Error: Honeycomb API key required. Provide via --api-key or set HONEYCOMB_API_KEY environment variable.")
         return
 
-    generator = WebAppMetricsGenerator(api_key, args.dataset)
+    generator = WebAppMetricsGenerator(api_key or "", args.dataset, parquet_path=args.parquet, seed=args.seed)
 
-    if args.realtime:
-        generator.run_realtime_generation(args.realtime)
-    else:
-        generator.run_historical_generation(args.days)
+    try:
+        if args.send_parquet:
+            generator.send_parquet_file(args.send_parquet)
+        elif args.realtime:
+            generator.run_realtime_generation(args.realtime)
+        else:
+            generator.run_historical_generation(args.days, args.end)
+    finally:
+        generator.close()
 
 
 if __name__ == "__main__":
@@ -28,6 +28,9 @@ def main():
     end_time = datetime.now(timezone.utc) - timedelta(days=1)
     generator.generate_metrics_for_timerange(start_time, end_time, interval_minutes=5)
 
+    # Send whatever is still buffered and stop the exporter threads
+    generator.close()
+
     print("\nExample completed!")
 
 if __name__ == "__main__":